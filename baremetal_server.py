@@ -9,26 +9,34 @@ GHX Bare-Metal Orchestrator
 """
 from __future__ import annotations
 
+import hashlib
 import io
 import json
 import logging
 import os
 import re
+import selectors
+import shlex
 import shutil
+import socket
 import tarfile
 import tempfile
 import threading
 import time
 import uuid
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, nullcontext
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 
 import paramiko
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # -----------------------------------------------------------------------------
 # 基础配置
@@ -45,10 +53,6 @@ ASSETS = {
     "ib_check": ASSET_DIR / "ib_health_check.sh",
 }
 
-for name, path in ASSETS.items():
-    if not path.exists():
-        logging.warning("Asset %s not found at %s", name, path)
-
 FALLBACK_GPU_BENCHMARKS = {
     "RTX 3090": {"p2p": 18, "nccl": 7, "bw": 20},
     "L40S": {"p2p": 28, "nccl": 9, "bw": 20},
@@ -73,18 +77,34 @@ logger = logging.getLogger("ghx-baremetal")
 # 记录资产目录配置
 logger.info("资产目录配置: BASE_DIR=%s, ASSET_DIR=%s (GHX_ASSET_DIR=%s)", 
            BASE_DIR, ASSET_DIR, os.getenv("GHX_ASSET_DIR", "未设置"))
+# 每个资源只检查一次（放在 basicConfig 之后，避免提前使用 logging 导致日志格式配置失效）
 for name, path in ASSETS.items():
     if path.exists():
         logger.debug("Asset %s found at %s", name, path)
+    else:
+        logger.warning("Asset %s not found at %s", name, path)
+
+# 允许跨域的来源，模块加载时确定一次
+CORS_ORIGINS = ("*",)
 
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+# 部署在反向代理之后时，通过 GHX_TRUSTED_PROXY_HOPS 指定可信的代理跳数，remote_addr 取代理追加的 X-Forwarded-For；
+# 默认 0 不信任该请求头（直接暴露端口时客户端可任意伪造）
+TRUSTED_PROXY_HOPS = int(os.getenv("GHX_TRUSTED_PROXY_HOPS", "0"))
+if TRUSTED_PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+# 响应中的中文直接按UTF-8输出（转义为 \uXXXX 体积翻倍），且不对键排序，减少轮询接口的序列化开销
+app.json.ensure_ascii = False
+app.json.sort_keys = False
+CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS}})
 
 
 @app.before_request
 def log_request_info():
-    """记录所有API请求"""
-    logger.info(
+    """记录所有API请求（DEBUG级别，前端轮询时避免刷屏）"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug(
         "Request: %s %s from %s",
         request.method,
         request.path,
@@ -110,8 +130,9 @@ def log_request_info():
 
 @app.after_request
 def log_response_info(response):
-    """记录API响应状态"""
-    logger.info(
+    """记录API响应状态，错误响应保留INFO级别"""
+    logger.log(
+        logging.INFO if response.status_code >= 400 else logging.DEBUG,
         "Response: %s %s -> %s",
         request.method,
         request.path,
@@ -122,20 +143,24 @@ def log_response_info(response):
 
 def load_gpu_benchmarks() -> Dict[str, Dict[str, float]]:
     path = Path(BENCHMARK_FILE)
-    if not path.exists():
-        logger.warning("GPU benchmark file %s not found, using fallback defaults", path)
-        return dict(FALLBACK_GPU_BENCHMARKS)
     try:
-        with open(path, "r", encoding="utf-8") as fp:
+        # utf-8-sig 兼容 Windows 编辑器保存时带 BOM 的配置文件
+        with open(path, "r", encoding="utf-8-sig") as fp:
             data = json.load(fp)
             logger.info("Loaded GPU benchmarks from %s", path)
             return data
+    except FileNotFoundError:
+        # 直接打开并捕获不存在的情况，省去单独的 exists 检查
+        logger.warning("GPU benchmark file %s not found, using fallback defaults", path)
+        return dict(FALLBACK_GPU_BENCHMARKS)
     except Exception as exc:  # pylint: disable=broad-except
         logger.warning("Failed to load GPU benchmarks from %s: %s. Using fallback.", path, exc)
         return dict(FALLBACK_GPU_BENCHMARKS)
 
 
 GPU_BENCHMARKS = load_gpu_benchmarks()
+# 预先计算基准型号的匹配键（小写、去空格），保持配置文件中的顺序
+GPU_BENCHMARK_MATCH_KEYS = tuple((key.lower().replace(" ", ""), key) for key in GPU_BENCHMARKS)
 
 # -----------------------------------------------------------------------------
 # 工具函数
@@ -146,17 +171,43 @@ def utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def build_payload(success: bool, data: Any = None, message: str = "") -> Dict[str, Any]:
+    """统一的响应结构，json_response 和 conditional_json_response 共用"""
+    return {"success": success, "message": message, "data": data, "timestamp": utc_now()}
+
+
 def json_response(success: bool, data: Any = None, message: str = "", status: int = 200):
-    payload = {"success": success, "message": message, "data": data, "timestamp": utc_now()}
-    return jsonify(payload), status
+    return jsonify(build_payload(success, data, message)), status
+
+
+def conditional_json_response(data: Any):
+    """返回带 ETag 的成功响应，结构与 json_response 相同
+
+    ETag 只由 data 计算（不含 timestamp）；轮询时数据未变化则返回 304，
+    浏览器直接复用缓存的响应体，不必重复传输和解析较大的执行日志。
+    每次轮询仍需完整序列化 data 并计算哈希，节省的是传输带宽而不是服务端的编码开销。
+    """
+    data_json = app.json.dumps(data)
+    etag = hashlib.sha1(data_json.encode("utf-8")).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build_payload(True, data))
+    response.set_etag(etag)
+    # 允许缓存但每次都需向服务端确认
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
+# GPU型号对同一节点是静态的，按原始名称缓存归一化结果
+@lru_cache(maxsize=256)
 def normalize_gpu_name(raw: str) -> str:
     if not raw:
         return "Unknown"
     cleaned = raw.strip()
-    for key in GPU_BENCHMARKS:
-        if key.lower().replace(" ", "") in cleaned.lower().replace(" ", ""):
+    compact = cleaned.lower().replace(" ", "")
+    for match_key, key in GPU_BENCHMARK_MATCH_KEYS:
+        if match_key in compact:
             return key
     return cleaned
 
@@ -167,6 +218,19 @@ def ensure_payload_fields(payload: Dict[str, Any], fields: List[str]):
         raise ValueError(f"缺少必填字段: {', '.join(missing)}")
 
 
+# 多处复用的远程命令，定义一次避免各处字面量不一致
+# 获取内网IP（默认路由的出口IP）
+INTERNAL_IP_COMMAND = "ip route get 1.1.1.1 2>/dev/null | grep -oP 'src \\K[0-9.]+' | head -n 1 || hostname -I | awk '{print $1}'"
+GPU_LIST_COMMAND = "nvidia-smi -L"
+# SSH互信第一步：确保 .ssh 目录存在、获取内网IP、没有密钥则生成、读取公钥，输出 GHX_*=value 行
+SSH_TRUST_COLLECT_SCRIPT = "; ".join([
+    "mkdir -p /root/.ssh && chmod 700 /root/.ssh",
+    f'echo "GHX_INTERNAL_IP=$({INTERNAL_IP_COMMAND})"',
+    "if [ ! -f /root/.ssh/id_rsa ]; then ssh-keygen -t rsa -b 2048 -f /root/.ssh/id_rsa -N '' -q && echo GHX_KEY_GENERATED=1; fi",
+    "echo \"GHX_PUBKEY=$(cat /root/.ssh/id_rsa.pub)\"",
+])
+
+
 def wrap_bash(command: str) -> str:
     safe = command.replace("'", "'\"'\"'")
     return f"bash -lc 'set -euo pipefail; {safe}'"
@@ -245,8 +309,17 @@ class SSHCommandResult:
 class SSHSession:
     """封装Paramiko连接，提供上传和执行命令的能力"""
 
-    def __init__(self, connection: Dict[str, Any]):
+    # 连接建立后统一设置一次：保活间隔（秒），以及SFTP窗口大小（默认2MB，上传大文件时频繁等待窗口调整）
+    KEEPALIVE_INTERVAL = 30
+    SFTP_WINDOW_SIZE = 32 * 1024 * 1024
+    # run_sections 输出中分隔各段的标记行（标记后紧跟命令序号）
+    SECTION_MARKER = "@@GHX_SECTION@@"
+    SECTION_SPLIT_RE = re.compile(r"\n" + re.escape(SECTION_MARKER) + r"(\d+)\n")
+
+    def __init__(self, connection: Dict[str, Any], cancel_event: Optional[threading.Event] = None):
         self.connection = connection
+        # 置位后正在执行的命令会被中止（终止远程进程并关闭通道），不必等待长时间的测试命令结束
+        self.cancel_event = cancel_event
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.username = connection.get("username", "root")
@@ -276,6 +349,10 @@ class SSHSession:
             raise ValueError("认证方式不支持")
 
         self.client.connect(**kwargs)
+        transport = self.client.get_transport()
+        if transport is not None:
+            # 编译/测试可能持续较久且期间无输出，保活避免被防火墙/NAT断开空闲连接
+            transport.set_keepalive(self.KEEPALIVE_INTERVAL)
         self._sftp = None  # 延迟初始化
         return self
 
@@ -288,10 +365,26 @@ class SSHSession:
     def sftp(self):
         """延迟初始化SFTP，只在需要时打开"""
         if self._sftp is None:
-            self._sftp = self.client.open_sftp()
+            self._sftp = paramiko.SFTPClient.from_transport(
+                self.client.get_transport(), window_size=self.SFTP_WINDOW_SIZE
+            )
         return self._sftp
 
     def run(self, command: str, timeout: int = 300, require_root: bool = False) -> SSHCommandResult:
+        if self.cancel_event is None:
+            return self._exec(command, timeout, require_root)
+        # 无PTY的通道关闭后远程进程不会随之结束：记录命令所在的会话ID，取消或超时时据此终止整个进程树
+        sid_file = f"/tmp/.ghx-cmd-{uuid.uuid4().hex}.sid"
+        tracked = f"trap 'rm -f {sid_file}' EXIT; {{ ps -o sid= -p $$ > {sid_file}; }} 2>/dev/null || true; {command}"
+        try:
+            result = self._exec(tracked, timeout, require_root)
+        except (RuntimeError, socket.timeout):
+            self._terminate_remote(sid_file, require_root)
+            raise
+        result.command = command
+        return result
+
+    def _exec(self, command: str, timeout: int, require_root: bool, check_cancel: bool = True) -> SSHCommandResult:
         wrapped = wrap_bash(command)
         if require_root and self.need_sudo:
             sudo_prefix = "sudo -S -p ''" if self.sudo_password else "sudo -n"
@@ -300,18 +393,119 @@ class SSHSession:
         if require_root and self.need_sudo and self.sudo_password:
             stdin.write(self.sudo_password + "\n")
             stdin.flush()
-        stdout_str = stdout.read().decode("utf-8", errors="ignore")
-        stderr_str = stderr.read().decode("utf-8", errors="ignore")
+        stdout_str, stderr_str = self._collect_output(stdout.channel, timeout, check_cancel)
         exit_code = stdout.channel.recv_exit_status()
         return SSHCommandResult(command=command, exit_code=exit_code, stdout=stdout_str, stderr=stderr_str)
 
-    def upload(self, local_path: Path, remote_path: str, executable: bool = False):
+    def _terminate_remote(self, sid_file: str, require_root: bool):
+        """终止 sid_file 记录的远程会话中的所有进程：先发 TERM，5 秒后仍未退出则 KILL"""
+        script = (
+            f'sid=$(tr -d " " 2>/dev/null < {sid_file} || true); '
+            'if [ -n "$sid" ]; then '
+            'pkill -TERM -s "$sid" || true; '
+            'for i in 1 2 3 4 5; do pgrep -s "$sid" >/dev/null || break; sleep 1; done; '
+            'pkill -KILL -s "$sid" || true; '
+            f'fi; rm -f {sid_file}'
+        )
+        try:
+            # cancel_event 已置位，终止命令本身不能再被取消检查中断
+            self._exec(script, 30, require_root, check_cancel=False)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("终止远程命令失败: %s", exc)
+
+    def run_sections(self, commands: List[str], timeout: int = 300, require_root: bool = False) -> List[str]:
+        """在一次远程执行中依次运行多条命令，按顺序返回各自的stdout
+
+        每条命令前先输出换行再输出带序号的标记行，上一条命令的输出不以换行结尾时标记也独占一行；
+        单条命令失败不影响后续命令（与分别执行时一致）。
+        """
+        script = "; ".join(
+            f"echo; echo {self.SECTION_MARKER}{index}; {{ {cmd}; }} || true" for index, cmd in enumerate(commands)
+        )
+        res = self.run(script, timeout=timeout, require_root=require_root)
+        outputs = [""] * len(commands)
+        # 输出形如 "\n<标记>0\n<输出0>\n<标记>1\n<输出1>"，按 "\n<标记><序号>\n" 切分后各段即为原始输出
+        parts = self.SECTION_SPLIT_RE.split(res.stdout)
+        for index, output in zip(parts[1::2], parts[2::2]):
+            if int(index) < len(outputs):
+                outputs[int(index)] = output
+        return outputs
+
+    def _collect_output(self, channel: paramiko.Channel, timeout: int, check_cancel: bool = True) -> tuple[str, str]:
+        """同时读取stdout和stderr直到命令结束
+
+        stdout和stderr共用同一个通道窗口，先读完stdout再读stderr时，
+        stderr输出较多会占满窗口导致远端阻塞、本地一直等到超时。
+        timeout 为无输出的最长等待时间（与原先通道读超时语义一致）。
+        等待期间每秒检查一次 cancel_event，取消时关闭通道并抛出异常。
+        exit-status 可能先于管道中剩余的输出到达，因此以收到 EOF 且缓冲区读空作为结束条件。
+        """
+        stdout_chunks: List[bytes] = []
+        stderr_chunks: List[bytes] = []
+
+        def drain() -> bool:
+            received = False
+            while channel.recv_ready():
+                stdout_chunks.append(channel.recv(65536))
+                received = True
+            while channel.recv_stderr_ready():
+                stderr_chunks.append(channel.recv_stderr(65536))
+                received = True
+            return received
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(channel, selectors.EVENT_READ)
+            deadline = time.monotonic() + timeout
+            while True:
+                received = drain()
+                if channel.eof_received and not channel.recv_ready() and not channel.recv_stderr_ready():
+                    break
+                if channel.closed:
+                    # 通道已关闭，读取缓冲区中剩余的数据后结束
+                    drain()
+                    break
+                if check_cancel and self.cancel_event is not None and self.cancel_event.is_set():
+                    channel.close()
+                    raise RuntimeError("任务已被取消，命令已中止")
+                if received:
+                    deadline = time.monotonic() + timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    channel.close()
+                    raise socket.timeout(f"命令执行超时（{timeout}秒无输出）")
+                selector.select(min(remaining, 1.0))
+        return (
+            b"".join(stdout_chunks).decode("utf-8", errors="ignore"),
+            b"".join(stderr_chunks).decode("utf-8", errors="ignore"),
+        )
+
+    def _remote_matches(self, remote_path: str, local_stat: os.stat_result, executable: bool) -> bool:
+        """远程文件大小和修改时间与本地一致（且需要时已可执行）则认为无需重新上传"""
+        try:
+            attrs = self.sftp.stat(remote_path)
+        except (IOError, OSError):
+            return False
+        if attrs.st_size != local_stat.st_size or int(attrs.st_mtime or 0) != int(local_stat.st_mtime):
+            return False
+        return not executable or bool((attrs.st_mode or 0) & 0o111)
+
+    def upload(self, local_path: Path, remote_path: str, executable: bool = False) -> bool:
+        """上传文件，远程已有相同文件时跳过；返回是否实际上传"""
+        local_stat = local_path.stat()
+        if self._remote_matches(remote_path, local_stat, executable):
+            return False
         remote_dir = Path(remote_path).parent.as_posix()
         self.run(f"mkdir -p {remote_dir}")
         posix_local = str(local_path)
         self.sftp.put(posix_local, remote_path)
         if executable:
             self.run(f"chmod +x {remote_path}", require_root=self.need_sudo)
+        try:
+            # 同步修改时间，作为下次上传前比对的签名（在chmod之后设置，签名一致即说明上次上传完整）
+            self.sftp.utime(remote_path, (local_stat.st_atime, local_stat.st_mtime))
+        except (IOError, OSError) as exc:
+            logger.debug("设置远程文件时间失败 %s: %s", remote_path, exc)
+        return True
     
     def upload_directory(self, local_dir: Path, remote_dir: str):
         """递归上传整个目录到远程"""
@@ -369,16 +563,14 @@ def parse_p2p(output: str) -> float:
         if "P2P=Disabled Latency Matrix" in line:
             break
         if collecting:
-            stripped = line.strip()
-            if not stripped:
-                continue
             parts = line.split()
+            if not parts:
+                continue
             # 跳过矩阵顶部的列标题（例如 "D\D 0 1 2 ..."）
             if not parts[0].isdigit():
                 continue
             row_idx = row_count
             row_count += 1
-            parts = line.split()
             if len(parts) <= 1:
                 continue
             for col_idx, value_str in enumerate(parts[1:]):
@@ -394,16 +586,74 @@ def parse_p2p(output: str) -> float:
     return min(values)
 
 
+# nccl-tests 汇总行，如 "# Avg bus bandwidth    : 150.123"
+NCCL_AVG_BUS_BW_RE = re.compile(r"Avg bus bandwidth\s*:\s*(\d+(?:\.\d+)?)")
+
+
 def parse_nccl(output: str) -> float:
-    for line in output.splitlines():
-        if "Avg bus bandwidth" in line:
-            parts = line.split()
-            for chunk in parts:
-                try:
-                    return float(chunk)
-                except ValueError:
-                    continue
-    return 0.0
+    # 直接在整段输出上搜索，多机测试输出较长时无需逐行拆分
+    match = NCCL_AVG_BUS_BW_RE.search(output)
+    return float(match.group(1)) if match else 0.0
+
+
+# hostfile 每行的第一个字段为主机名（后面可能跟 slots=N 等参数），# 开头为注释
+HOSTFILE_HOST_RE = re.compile(r"^[ \t]*([^\s#]+)", re.MULTILINE)
+
+
+def parse_hostfile_hosts(content: str) -> List[str]:
+    return HOSTFILE_HOST_RE.findall(content)
+
+
+def build_nccl_compile_script(remote_dir: str = "/tmp/ghx", done_message: str = "编译完成") -> str:
+    """生成解压并编译 nccl、nccl-tests 的脚本（单机测试、多机主节点和其他节点共用）"""
+    nccl_dir = f"{remote_dir}/nccl"
+    nccl_tests_dir = f"{remote_dir}/nccl-tests"
+    return f"""set -e
+# 清理旧目录
+rm -rf {nccl_dir} {nccl_tests_dir}
+
+# 解压 nccl
+echo "解压 nccl.tgz..."
+tar -xzf {remote_dir}/nccl.tgz -C {remote_dir}
+rm -f {remote_dir}/nccl.tgz
+
+# 编译 nccl
+echo "编译 nccl..."
+cd {nccl_dir}
+make -j$(nproc) CUDA_HOME=/usr/local/cuda 2>&1 | tee /tmp/nccl_build.log
+if [ $? -ne 0 ]; then
+    echo "错误: nccl 编译失败"
+    cat /tmp/nccl_build.log
+    exit 1
+fi
+
+# 设置 NCCL_HOME
+export NCCL_HOME={nccl_dir}
+
+# 解压 nccl-tests
+echo "解压 nccl-tests.tgz..."
+tar -xzf {remote_dir}/nccl-tests.tgz -C {remote_dir}
+rm -f {remote_dir}/nccl-tests.tgz
+
+# 编译 nccl-tests
+echo "编译 nccl-tests..."
+cd {nccl_tests_dir}
+make -j$(nproc) CUDA_HOME=/usr/local/cuda NCCL_HOME=$NCCL_HOME 2>&1 | tee /tmp/nccl_tests_build.log
+if [ $? -ne 0 ]; then
+    echo "错误: nccl-tests 编译失败"
+    cat /tmp/nccl_tests_build.log
+    exit 1
+fi
+
+# 验证文件是否存在
+if [ ! -f {nccl_tests_dir}/build/all_reduce_perf ]; then
+    echo "错误: {nccl_tests_dir}/build/all_reduce_perf 不存在"
+    exit 1
+fi
+
+chmod +x {nccl_tests_dir}/build/all_reduce_perf
+echo "{done_message}"
+"""
 
 
 # -----------------------------------------------------------------------------
@@ -412,6 +662,15 @@ def parse_nccl(output: str) -> float:
 
 
 class RemoteNodeRunner:
+    # 测试项 -> (执行方法, 原始输出日志标题)，按此顺序执行
+    TEST_STEPS = (
+        ("nvbandwidth", "_run_nvbandwidth", "nvbandwidth命令输出"),
+        ("p2p", "_run_p2p", "p2pBandwidthLatencyTest命令输出"),
+        ("nccl", "_run_nccl_tests", "NCCL测试命令输出"),
+        ("dcgm", "_run_dcgm_diag", "DCGM诊断命令输出"),
+        ("ib", "_run_ib_check", "IB检查命令输出"),
+    )
+
     def __init__(self, node_meta: Dict[str, Any], tests: List[str], dcgm_level: int, connection: Dict[str, Any], cancelled_flag: Optional[threading.Event] = None):
         self.node_meta = node_meta
         self.tests = tests
@@ -437,133 +696,66 @@ class RemoteNodeRunner:
             return None
         return GPU_BENCHMARKS.get(gpu_type, {}).get(metric)
 
+    def _build_result(self, results: Dict[str, Any], overall_status: str) -> Dict[str, Any]:
+        return {
+            "results": results,
+            "overallStatus": overall_status,
+            "executionLog": "\n".join(self.logs),
+            "gpuType": self.node_meta.get("gpuType", "Unknown"),
+        }
+
+    def _cancelled_result(self, results: Dict[str, Any], message: str = "任务已被取消，停止执行") -> Dict[str, Any]:
+        self.log(message)
+        return self._build_result(results, "cancelled")
+
     def execute(self) -> Dict[str, Any]:
         results: Dict[str, Any] = {}
         if self.cancelled.is_set():
-            self.log("任务已被取消，停止执行")
-            return {
-                "results": {},
-                "overallStatus": "cancelled",
-                "executionLog": "\n".join(self.logs),
-                "gpuType": self.node_meta.get("gpuType", "Unknown"),
-            }
+            return self._cancelled_result(results)
         
-        with SSHSession(self.connection) as session:
+        with SSHSession(self.connection, cancel_event=self.cancelled) as session:
             self.session = session
             self.log("SSH连接已建立")
             
             if self.cancelled.is_set():
-                self.log("任务已被取消，停止执行")
-                return {
-                    "results": {},
-                    "overallStatus": "cancelled",
-                    "executionLog": "\n".join(self.logs),
-                    "gpuType": self.node_meta.get("gpuType", "Unknown"),
-                }
+                return self._cancelled_result(results)
             
-            session.run(f"mkdir -p {self.remote_dir}")
-
-            gpu_info = self._query_gpu_info()
+            try:
+                session.run(f"mkdir -p {self.remote_dir}")
+                gpu_info = self._query_gpu_info()
+            except RuntimeError:
+                # 命令被取消时抛出 RuntimeError，按取消处理而不是节点失败
+                if self.cancelled.is_set():
+                    return self._cancelled_result(results)
+                raise
             self.node_meta["gpuType"] = gpu_info["model"]
             self.node_meta["gpuList"] = gpu_info["list"]
 
             if self.cancelled.is_set():
-                self.log("任务已被取消，停止执行")
-                return {
-                    "results": {},
-                    "overallStatus": "cancelled",
-                    "executionLog": "\n".join(self.logs),
-                    "gpuType": self.node_meta.get("gpuType", "Unknown"),
-                }
-
-            if "nvbandwidth" in self.tests:
-                if self.cancelled.is_set():
-                    self.log("任务已被取消，停止执行nvbandwidth测试")
-                    return {
-                        "results": results,
-                        "overallStatus": "cancelled",
-                        "executionLog": "\n".join(self.logs),
-                        "gpuType": self.node_meta.get("gpuType", "Unknown"),
-                    }
-                result = self._run_nvbandwidth()
-                results["nvbandwidth"] = result
-                if result.get("rawOutput"):
-                    self.log(f"nvbandwidth命令输出:\n{result['rawOutput']}")
-            if "p2p" in self.tests:
-                if self.cancelled.is_set():
-                    self.log("任务已被取消，停止执行p2p测试")
-                    return {
-                        "results": results,
-                        "overallStatus": "cancelled",
-                        "executionLog": "\n".join(self.logs),
-                        "gpuType": self.node_meta.get("gpuType", "Unknown"),
-                    }
-                result = self._run_p2p()
-                results["p2p"] = result
-                if result.get("rawOutput"):
-                    self.log(f"p2pBandwidthLatencyTest命令输出:\n{result['rawOutput']}")
-            if "nccl" in self.tests:
-                if self.cancelled.is_set():
-                    self.log("任务已被取消，停止执行nccl测试")
-                    return {
-                        "results": results,
-                        "overallStatus": "cancelled",
-                        "executionLog": "\n".join(self.logs),
-                        "gpuType": self.node_meta.get("gpuType", "Unknown"),
-                    }
-                result = self._run_nccl_tests()
-                results["nccl"] = result
-                if result.get("rawOutput"):
-                    self.log(f"NCCL测试命令输出:\n{result['rawOutput']}")
-            if "dcgm" in self.tests:
-                if self.cancelled.is_set():
-                    self.log("任务已被取消，停止执行dcgm测试")
-                    return {
-                        "results": results,
-                        "overallStatus": "cancelled",
-                        "executionLog": "\n".join(self.logs),
-                        "gpuType": self.node_meta.get("gpuType", "Unknown"),
-                    }
-                result = self._run_dcgm_diag()
-                results["dcgm"] = result
-                if result.get("rawOutput"):
-                    self.log(f"DCGM诊断命令输出:\n{result['rawOutput']}")
-            if "ib" in self.tests:
+                return self._cancelled_result(results)
+
+            # 按 TEST_STEPS 顺序执行选中的测试，每项开始前检查取消标志
+            for test_key, method_name, output_label in self.TEST_STEPS:
+                if test_key not in self.tests:
+                    continue
                 if self.cancelled.is_set():
-                    self.log("任务已被取消，停止执行ib测试")
-                    return {
-                        "results": results,
-                        "overallStatus": "cancelled",
-                        "executionLog": "\n".join(self.logs),
-                        "gpuType": self.node_meta.get("gpuType", "Unknown"),
-                    }
-                result = self._run_ib_check()
-                results["ib"] = result
+                    return self._cancelled_result(results, f"任务已被取消，停止执行{test_key}测试")
+                result = getattr(self, method_name)()
+                results[test_key] = result
                 if result.get("rawOutput"):
-                    self.log(f"IB检查命令输出:\n{result['rawOutput']}")
+                    self.log(f"{output_label}:\n{result['rawOutput']}")
 
         if self.cancelled.is_set():
-            self.log("任务已被取消")
-            return {
-                "results": results,
-                "overallStatus": "cancelled",
-                "executionLog": "\n".join(self.logs),
-                "gpuType": self.node_meta.get("gpuType", "Unknown"),
-            }
+            return self._cancelled_result(results, "任务已被取消")
 
         overall_pass = all(
             res.get("status") in ("passed", "skipped")
             for res in results.values()
         )
-        return {
-            "results": results,
-            "overallStatus": "passed" if overall_pass else "failed",
-            "executionLog": "\n".join(self.logs),
-            "gpuType": self.node_meta.get("gpuType", "Unknown"),
-        }
+        return self._build_result(results, "passed" if overall_pass else "failed")
 
     def _query_gpu_info(self) -> Dict[str, Any]:
-        gpu_cmd = self.session.run("nvidia-smi -L || true")
+        gpu_cmd = self.session.run(f"{GPU_LIST_COMMAND} || true")
         gpu_lines = [line.strip() for line in gpu_cmd.stdout.splitlines() if line.strip()]
         primary_gpu = gpu_lines[0] if gpu_lines else "Unknown"
         short_name = normalize_gpu_name(primary_gpu)
@@ -575,8 +767,10 @@ class RemoteNodeRunner:
         if not local_path.exists():
             raise FileNotFoundError(f"缺少{key}资源 {local_path}")
         remote_path = f"{self.remote_dir}/{remote_name}"
-        self.session.upload(local_path, remote_path, executable=executable)
-        self.log(f"上传资源 {key} -> {remote_path}")
+        if self.session.upload(local_path, remote_path, executable=executable):
+            self.log(f"上传资源 {key} -> {remote_path}")
+        else:
+            self.log(f"远程资源 {key} 未变化，跳过上传 ({remote_path})")
         return remote_path
 
     def _run_nvbandwidth(self) -> Dict[str, Any]:
@@ -663,8 +857,6 @@ class RemoteNodeRunner:
                 
                 remote_nccl_tgz = f"{self.remote_dir}/nccl.tgz"
                 remote_nccl_tests_tgz = f"{self.remote_dir}/nccl-tests.tgz"
-                remote_nccl_dir = f"{self.remote_dir}/nccl"
-                remote_nccl_tests_dir = f"{self.remote_dir}/nccl-tests"
                 
                 # 上传压缩包
                 self.log("上传 nccl.tgz 和 nccl-tests.tgz 到远程节点")
@@ -673,53 +865,7 @@ class RemoteNodeRunner:
                 
                 # 编译 nccl 和 nccl-tests
                 self.log("在远程节点编译 nccl 和 nccl-tests")
-                compile_script = f"""
-set -e
-# 清理旧目录
-rm -rf {remote_nccl_dir} {remote_nccl_tests_dir}
-
-# 解压 nccl
-echo "解压 nccl.tgz..."
-tar -xzf {remote_nccl_tgz} -C {self.remote_dir}
-rm -f {remote_nccl_tgz}
-
-# 编译 nccl
-echo "编译 nccl..."
-cd {remote_nccl_dir}
-make -j$(nproc) CUDA_HOME=/usr/local/cuda 2>&1 | tee /tmp/nccl_build.log
-if [ $? -ne 0 ]; then
-    echo "错误: nccl 编译失败"
-    cat /tmp/nccl_build.log
-    exit 1
-fi
-
-# 设置 NCCL_HOME
-export NCCL_HOME={remote_nccl_dir}
-
-# 解压 nccl-tests
-echo "解压 nccl-tests.tgz..."
-tar -xzf {remote_nccl_tests_tgz} -C {self.remote_dir}
-rm -f {remote_nccl_tests_tgz}
-
-# 编译 nccl-tests
-echo "编译 nccl-tests..."
-cd {remote_nccl_tests_dir}
-make -j$(nproc) CUDA_HOME=/usr/local/cuda NCCL_HOME=$NCCL_HOME 2>&1 | tee /tmp/nccl_tests_build.log
-if [ $? -ne 0 ]; then
-    echo "错误: nccl-tests 编译失败"
-    cat /tmp/nccl_tests_build.log
-    exit 1
-fi
-
-# 验证文件是否存在
-if [ ! -f {remote_nccl_tests_dir}/build/all_reduce_perf ]; then
-    echo "错误: {remote_nccl_tests_dir}/build/all_reduce_perf 不存在"
-    exit 1
-fi
-
-chmod +x {remote_nccl_tests_dir}/build/all_reduce_perf
-echo "编译完成"
-"""
+                compile_script = build_nccl_compile_script(self.remote_dir)
                 compile_result = self.session.run(compile_script, timeout=600, require_root=True)
                 if compile_result.exit_code != 0:
                     raise RuntimeError(f"编译失败: {compile_result.stderr or compile_result.stdout}")
@@ -769,9 +915,8 @@ echo "编译完成"
 
     def _run_ib_check(self) -> Dict[str, Any]:
         try:
+            # 上传时已保证脚本可执行（跳过上传时也会校验可执行位），无需再单独 chmod
             remote_script = self._upload_asset("ib_check", "ib_health_check.sh")
-            # 确保脚本可执行
-            self.session.run(f"chmod +x {remote_script}", require_root=True)
             cmd = (
                 f"cd {self.remote_dir} && "
                 "export TERM=xterm; "
@@ -802,37 +947,50 @@ echo "编译完成"
 jobs: Dict[str, Dict[str, Any]] = {}
 jobs_lock = threading.Lock()
 
+# 同时执行的Job数量上限（每个Job内部还会按节点并发SSH），超出的Job保持pending排队；<=0 表示不限制
+MAX_CONCURRENT_JOBS = int(os.getenv("GHX_MAX_CONCURRENT_JOBS", "0"))
+job_slots = threading.BoundedSemaphore(MAX_CONCURRENT_JOBS) if MAX_CONCURRENT_JOBS > 0 else None
+# 已提交且尚未结束的Job（受 jobs_lock 保护），用于避免同一Job被重复执行
+active_job_ids: set = set()
+
+# 已结束的Job/多机测试在内存中保留的时长（秒），超时后由后台线程清理；<=0 表示不清理
+FINISHED_JOB_TTL_SECONDS = int(os.getenv("GHX_FINISHED_JOB_TTL", "86400"))
+FINISHED_JOB_CLEANUP_INTERVAL = 60
+FINISHED_JOB_STATUSES = ("completed", "failed", "cancelled")
+
 
 def sanitize_job(job: Dict[str, Any]) -> Dict[str, Any]:
-    # 创建副本，移除不能序列化的对象
-    job_copy = {}
-    for key, value in job.items():
-        if key == "cancelled":
-            # 将 Event 对象转换为布尔值
-            if isinstance(value, threading.Event):
-                job_copy[key] = value.is_set()
-            else:
-                job_copy[key] = value
-        elif key == "nodes":
-            # 处理节点列表
-            nodes_copy = []
-            for node in value:
-                node_copy = {}
-                for node_key, node_value in node.items():
-                    if node_key != "_connection":
-                        node_copy[node_key] = node_value
-                nodes_copy.append(node_copy)
-            job_copy[key] = nodes_copy
-        else:
-            job_copy[key] = value
+    # 创建副本，移除不能序列化的对象（保持原有字段顺序）
+    job_copy = dict(job)
+    cancelled = job_copy.get("cancelled")
+    if isinstance(cancelled, threading.Event):
+        # 将 Event 对象转换为布尔值
+        job_copy["cancelled"] = cancelled.is_set()
+    if "nodes" in job_copy:
+        # 节点中的连接信息（含认证凭据）不返回给前端
+        job_copy["nodes"] = [
+            {node_key: node_value for node_key, node_value in node.items() if node_key != "_connection"}
+            for node in job_copy["nodes"]
+        ]
     return job_copy
 
 
 def start_job_worker(job_id: str):
-    thread = threading.Thread(target=run_job, args=(job_id,), daemon=True)
+    """启动Job工作线程；调用方需已在 jobs_lock 内将 job_id 加入 active_job_ids"""
+    thread = threading.Thread(target=run_job_with_slot, args=(job_id,), daemon=True)
     thread.start()
 
 
+def run_job_with_slot(job_id: str):
+    """占用一个执行槽位后运行Job，槽位已满时排队等待（未设置上限时直接运行）"""
+    try:
+        with job_slots if job_slots is not None else nullcontext():
+            run_job(job_id)
+    finally:
+        with jobs_lock:
+            active_job_ids.discard(job_id)
+
+
 def run_node_check(node: Dict[str, Any], tests: List[str], dcgm_level: str, cancelled_flag: Optional[threading.Event] = None):
     """在单个节点上执行健康检查（用于并发执行）"""
     node["status"] = "running"
@@ -861,6 +1019,17 @@ def run_job(job_id: str):
         job = jobs.get(job_id)
         if not job:
             return
+        if "cancelled" in job and job["cancelled"].is_set():
+            # 排队期间已被取消，不再执行
+            job["status"] = "cancelled"
+            job["updatedAt"] = utc_now()
+            for node in job["nodes"]:
+                node.pop("_connection", None)
+                if node["status"] in ("pending", "cancelling"):
+                    node["status"] = "cancelled"
+                    node["completedAt"] = job["updatedAt"]
+            logger.info("任务 %s 在排队期间已被取消，跳过执行", job_id)
+            return
         job["status"] = "running"
         job["updatedAt"] = utc_now()
         # 创建取消标志
@@ -892,13 +1061,14 @@ def run_job(job_id: str):
                         job = jobs.get(job_id)
                         if job:
                             job["status"] = "cancelled"
-                            job["updatedAt"] = utc_now()
+                            # 同一批状态更新共用一个时间戳
+                            job["updatedAt"] = now = utc_now()
                             # 更新所有未完成的节点状态
                             for node in job["nodes"]:
                                 if node["status"] in ("running", "cancelling"):
                                     node["status"] = "cancelled"
                                     if not node.get("completedAt"):
-                                        node["completedAt"] = utc_now()
+                                        node["completedAt"] = now
                     # 不再等待剩余任务，直接返回
                     return
                 
@@ -921,7 +1091,7 @@ def run_job(job_id: str):
         job = jobs.get(job_id)
         if not job:
             return
-        job["updatedAt"] = utc_now()
+        job["updatedAt"] = now = utc_now()
         if cancelled_flag.is_set():
             # 如果已经取消，确保状态是 cancelled
             job["status"] = "cancelled"
@@ -930,7 +1100,7 @@ def run_job(job_id: str):
                 if node["status"] in ("running", "cancelling"):
                     node["status"] = "cancelled"
                     if not node.get("completedAt"):
-                        node["completedAt"] = utc_now()
+                        node["completedAt"] = now
         else:
             job["status"] = (
                 "completed"
@@ -972,21 +1142,23 @@ def api_test_connection():
                 raise ValueError(f"私钥格式错误: {key_exc}") from key_exc
         
         with SSHSession(connection) as session:
-            hostname_res = session.run("hostname")
-            gpu_res = session.run("nvidia-smi -L || true")
-            driver_res = session.run("nvidia-smi --query-gpu=driver_version --format=csv,noheader | head -n 1 || true")
-            # 获取内网IP（默认路由的出口IP）
-            internal_ip_res = session.run("ip route get 1.1.1.1 2>/dev/null | grep -oP 'src \\K[0-9.]+' | head -n 1 || hostname -I | awk '{print $1}'")
-        gpu_lines = [line.strip() for line in gpu_res.stdout.splitlines() if line.strip()]
+            # 四项信息合并为一次远程执行
+            hostname_output, gpus_output, driver_output, internal_ip_output = session.run_sections([
+                "hostname",
+                GPU_LIST_COMMAND,
+                "nvidia-smi --query-gpu=driver_version --format=csv,noheader | head -n 1",
+                INTERNAL_IP_COMMAND,
+            ])
+        gpu_lines = [line.strip() for line in gpus_output.splitlines() if line.strip()]
         gpu_count = len(gpu_lines)
         gpu_model = normalize_gpu_name(gpu_lines[0]) if gpu_lines else "Unknown"
-        internal_ip = internal_ip_res.stdout.strip() if internal_ip_res.stdout.strip() else None
+        internal_ip = internal_ip_output.strip() or None
         data = {
-            "hostname": hostname_res.stdout.strip(),
+            "hostname": hostname_output.strip(),
             "gpus": gpu_lines,  # 保留完整列表用于兼容
             "gpuModel": gpu_model,  # GPU型号
             "gpuCount": gpu_count,  # GPU数量
-            "driverVersion": driver_res.stdout.strip(),
+            "driverVersion": driver_output.strip(),
             "internalIp": internal_ip,  # 内网IP
         }
         logger.info("SSH连接测试成功: %s, 内网IP: %s", data.get("hostname"), internal_ip)
@@ -997,14 +1169,23 @@ def api_test_connection():
         return json_response(False, message=error_msg, status=400)
 
 
+# apt list 的已安装标记，如 [installed]、[installed,automatic]、[installed,upgradable to: ...]
+APT_INSTALLED_RE = re.compile(r"\[[^\]\n]*\binstalled\b[^\]\n]*\]", re.IGNORECASE)
+# nvcc --version 中的 "release X.Y" 或 "VX.Y.Z"
+CUDA_RELEASE_RE = re.compile(r'release\s+(\d+\.\d+)')
+CUDA_V_RE = re.compile(r'V(\d+\.\d+)')
+# NCCL 包版本，如 2.26.2-1+cuda12.8；宽松模式只匹配 cudaX.Y
+NCCL_PACKAGE_VERSION_RE = re.compile(r'(\d+\.\d+\.\d+)-\d+\+cuda(\d+\.\d+)')
+NCCL_CUDA_SUFFIX_RE = re.compile(r'cuda(\d+\.\d+)')
+
+
 def extract_cuda_version(nvcc_output: str) -> str:
     """从 nvcc --version 输出中提取 CUDA 版本号"""
-    import re
     # 匹配 "release X.Y" 或 "V X.Y.Z"
-    match = re.search(r'release\s+(\d+\.\d+)', nvcc_output)
+    match = CUDA_RELEASE_RE.search(nvcc_output)
     if match:
         return match.group(1)
-    match = re.search(r'V(\d+\.\d+)', nvcc_output)
+    match = CUDA_V_RE.search(nvcc_output)
     if match:
         return match.group(1)
     logger.warning("extract_cuda_version: 未能从输出中提取CUDA版本")
@@ -1013,7 +1194,6 @@ def extract_cuda_version(nvcc_output: str) -> str:
 
 def extract_nccl_version(apt_output: str, package_name: str) -> str:
     """从 apt list 输出中提取 NCCL 包版本"""
-    import re
     lines = apt_output.splitlines()
     logger.debug("extract_nccl_version: 查找包 %s, 输入行数=%d", package_name, len(lines))
     
@@ -1025,28 +1205,25 @@ def extract_nccl_version(apt_output: str, package_name: str) -> str:
         
         # 检查包名和 [installed] 标记
         has_package = package_name in line_stripped
-        # 使用关键字匹配方法：检查 "installed" 是否在方括号之间
-        has_installed = ("installed" in line_stripped.lower() and 
-                        "[" in line_stripped and "]" in line_stripped)
+        installed_marker = APT_INSTALLED_RE.search(line_stripped)
         
         logger.debug("extract_nccl_version: 行[%d]: package_name(%s) in line=%s, '[installed]' in line=%s", 
-                   idx, package_name, has_package, has_installed)
+                   idx, package_name, has_package, bool(installed_marker))
         
-        if has_package and has_installed:
+        if has_package and installed_marker:
             # 格式: libnccl2/unknown,now 2.26.2-1+cuda12.8 amd64 [installed,upgradable to: 2.27.3-1+cuda12.9]
-            # 只匹配 [installed] 之前的内容，避免匹配到 upgradable to 后的版本
-            installed_part = line_stripped.split("[installed]")[0].strip()
+            # 只匹配 [installed...] 之前的内容，避免匹配到 upgradable to 后的版本
+            installed_part = line_stripped[:installed_marker.start()].strip()
             # 格式: libnccl2/unknown,now 2.26.2-1+cuda12.8 amd64
             # 匹配版本号格式: 数字.数字.数字-数字+cuda数字.数字
-            import re
-            match = re.search(r'(\d+\.\d+\.\d+)-\d+\+cuda(\d+\.\d+)', installed_part)
+            match = NCCL_PACKAGE_VERSION_RE.search(installed_part)
             if match:
                 cuda_version = match.group(2)
                 logger.debug("extract_nccl_version: 提取到CUDA版本: %s (完整匹配: %s)", cuda_version, match.group(0))
                 return cuda_version
             else:
                 # 尝试更宽松的匹配
-                match2 = re.search(r'cuda(\d+\.\d+)', installed_part)
+                match2 = NCCL_CUDA_SUFFIX_RE.search(installed_part)
                 if match2:
                     cuda_version = match2.group(1)
                     logger.debug("extract_nccl_version: 通过宽松模式提取到CUDA版本: %s", cuda_version)
@@ -1058,6 +1235,64 @@ def extract_nccl_version(apt_output: str, package_name: str) -> str:
     return ""
 
 
+def check_nvidia_peermem(session: SSHSession) -> bool:
+    """检查 nvidia_peermem 内核模块是否加载（有输出说明模块已加载）"""
+    res = session.run("lsmod | grep nvidia_peermem")
+    return bool(res.stdout.strip())
+
+
+def check_nouveau_unloaded(session: SSHSession) -> bool:
+    """检查 nouveau 驱动是否已卸载（没有输出才是通过）"""
+    res = session.run("lsmod | grep nouveau")
+    return not bool(res.stdout.strip())
+
+
+def check_acsctl_disabled(session: SSHSession) -> bool:
+    """检查 ACS 是否已关闭（所有都应该是减号，不能有 + 号）"""
+    # 检查 lspci 输出中 ACSCtl 行（需要 root 权限才能看到详细信息）
+    check_cmd = "sudo lspci -vvv 2>/dev/null | grep -i acsctl || lspci -vvv 2>/dev/null | grep -i acsctl"
+    res = session.run(check_cmd, require_root=True)
+    acsctl_output = res.stdout.strip()
+    if acsctl_output:
+        # 检查是否有任何 + 号（如 SrcValid+ TransBlk+ 等）
+        # 有 + 号表示 ACS 未完全关闭
+        return '+' not in acsctl_output
+    # 没有 ACSCtl 输出，可能设备不支持 ACS，视为通过
+    return True
+
+
+def check_fabricmanager_active(session: SSHSession) -> bool:
+    """检查 nvidia-fabricmanager 服务是否激活"""
+    res = session.run("systemctl is-active nvidia-fabricmanager.service 2>/dev/null || echo inactive")
+    return res.stdout.strip() == "active"
+
+
+def check_ulimit_unlimited(session: SSHSession, name: str, option: str) -> bool:
+    """检查 ulimit 指定选项（如 -l、-m）的限制是否为 unlimited
+
+    直接查询单个选项，只输出取值（如 "unlimited" 或 "264176236"），无需解析 ulimit -a 的整张表。
+    注意：必须以root权限检查，因为测试是以root权限运行的
+    """
+    res = session.run(f"ulimit {option} 2>/dev/null", require_root=True)
+    value = res.stdout.strip().lower() or None
+    is_unlimited = value == "unlimited"
+    logger.debug("%s检查(以root权限): ulimit %s 取值='%s', 是否unlimited=%s, 结果=%s", 
+               name, option, value, is_unlimited, "通过" if is_unlimited else "失败")
+    return is_unlimited
+
+
+# 特殊检查项 -> 检查函数；不在表中的按包名、可执行文件路径或命令名处理
+CHECK_COMMAND_HANDLERS: Dict[str, Callable[[SSHSession], bool]] = {
+    "nvidia_peermem": check_nvidia_peermem,
+    "nouveau_unloaded": check_nouveau_unloaded,
+    "acsctl_disabled": check_acsctl_disabled,
+    "nvidia_fabricmanager_active": check_fabricmanager_active,
+    # max locked memory / max memory size
+    "ulimit_max_locked_memory": lambda session: check_ulimit_unlimited(session, "ulimit_max_locked_memory", "-l"),
+    "ulimit_max_memory_size": lambda session: check_ulimit_unlimited(session, "ulimit_max_memory_size", "-m"),
+}
+
+
 @app.route("/api/ssh/check-commands", methods=["POST"])
 def api_check_commands():
     try:
@@ -1067,118 +1302,53 @@ def api_check_commands():
         ensure_payload_fields(connection, ["host", "username", "auth"])
         if not commands:
             raise ValueError("commands不能为空")
+        # 命令名只作为结果的键并经 shlex.quote 拼入探测命令，任意非空字符串均可；其他类型直接拒绝
+        if not isinstance(commands, list) or not all(isinstance(cmd, str) and cmd for cmd in commands):
+            raise ValueError("commands必须是非空字符串列表")
         results = {}
         versions = {}
         
         with SSHSession(connection) as session:
+            # NCCL 包列表只查询一次，包检测和版本比对共用同一份输出
+            # apt list 需要 root 权限
+            apt_res = session.run("apt list --installed 2>/dev/null | grep -E '^libnccl' || true", require_root=True)
+            installed_packages = {
+                line.strip().split("/", 1)[0]
+                for line in apt_res.stdout.splitlines()
+                if APT_INSTALLED_RE.search(line)
+            }
+            
+            # 需要远程探测的命令名及对应的探测命令，按位置与 run_sections 的输出对应
+            probe_names: List[str] = []
+            probe_commands: List[str] = []
             for cmd in commands:
+                handler = CHECK_COMMAND_HANDLERS.get(cmd)
                 # 检查是否是包名（libnccl2, libnccl-dev）
                 if cmd in ("libnccl2", "libnccl-dev"):
-                    # 使用更简单的命令，直接检查包名和 [installed] 标记
-                    # apt list 需要 root 权限
-                    check_cmd = f"apt list --installed 2>/dev/null | grep -E '^{cmd}/'"
-                    res = session.run(check_cmd, require_root=True)
-                    output = res.stdout.strip()
-                    # 检查输出中是否包含 [installed]
-                    # 使用关键字匹配方法：检查 "installed" 是否在方括号之间
-                    has_installed = False
-                    if output:
-                        has_installed = ("installed" in output.lower() and 
-                                        "[" in output and "]" in output and
-                                        output.find("[") < output.find("installed", output.find("[")) < output.find("]", output.find("[")))
-                    logger.debug("包检测 %s: 输出长度=%d, 包含[installed]=%s", cmd, len(output), has_installed)
+                    # 直接检查包名和 [installed] 标记
+                    has_installed = cmd in installed_packages
+                    logger.debug("包检测 %s: 已安装包=%s, 包含[installed]=%s", cmd, sorted(installed_packages), has_installed)
                     results[cmd] = has_installed
-                # 检查 nvidia_peermem 内核模块是否加载
-                elif cmd == "nvidia_peermem":
-                    check_cmd = "lsmod | grep nvidia_peermem"
-                    res = session.run(check_cmd)
-                    # 有输出说明模块已加载
-                    results[cmd] = bool(res.stdout.strip())
-                # 检查 nouveau 驱动是否已卸载（应该没有输出才是通过）
-                elif cmd == "nouveau_unloaded":
-                    check_cmd = "lsmod | grep nouveau"
-                    res = session.run(check_cmd)
-                    # 没有输出说明已卸载
-                    results[cmd] = not bool(res.stdout.strip())
-                # 检查 ACS 是否已关闭（所有都应该是减号，不能有 + 号）
-                elif cmd == "acsctl_disabled":
-                    # 检查 lspci 输出中 ACSCtl 行（需要 root 权限才能看到详细信息）
-                    check_cmd = "sudo lspci -vvv 2>/dev/null | grep -i acsctl || lspci -vvv 2>/dev/null | grep -i acsctl"
-                    res = session.run(check_cmd, require_root=True)
-                    acsctl_output = res.stdout.strip()
-                    if acsctl_output:
-                        # 检查是否有任何 + 号（如 SrcValid+ TransBlk+ 等）
-                        # 有 + 号表示 ACS 未完全关闭
-                        has_plus = '+' in acsctl_output
-                        results[cmd] = not has_plus
-                    else:
-                        # 没有 ACSCtl 输出，可能设备不支持 ACS，视为通过
-                        results[cmd] = True
-                # 检查 nvidia-fabricmanager 服务是否激活
-                elif cmd == "nvidia_fabricmanager_active":
-                    check_cmd = "systemctl is-active nvidia-fabricmanager.service 2>/dev/null || echo inactive"
-                    res = session.run(check_cmd)
-                    results[cmd] = res.stdout.strip() == "active"
-                # 检查 ulimit max locked memory 是否为 unlimited
-                # 注意：必须以root权限检查，因为测试是以root权限运行的
-                elif cmd == "ulimit_max_locked_memory":
-                    check_cmd = "ulimit -a 2>/dev/null"
-                    res = session.run(check_cmd, require_root=True)
-                    # 解析 ulimit -a 输出，查找 max locked memory 行
-                    value = None
-                    matched_line = None
-                    for line in res.stdout.splitlines():
-                        line_lower = line.lower()
-                        if "max locked memory" in line_lower:
-                            matched_line = line
-                            # 格式: "max locked memory           (kbytes, -l) 264176236"
-                            # 或者: "max locked memory           (kbytes, -l) unlimited"
-                            # 直接取最后一列（split() 会处理多个空格）
-                            parts = line.split()
-                            if parts:
-                                value = parts[-1].strip().lower()
-                            break
-                    is_unlimited = (value == "unlimited") if value else False
-                    logger.debug("ulimit_max_locked_memory检查(以root权限): 原始行='%s', 提取值='%s', 是否unlimited=%s, 结果=%s", 
-                               matched_line, value, is_unlimited, "通过" if is_unlimited else "失败")
-                    results[cmd] = is_unlimited
-                # 检查 ulimit max memory size 是否为 unlimited
-                # 注意：必须以root权限检查，因为测试是以root权限运行的
-                elif cmd == "ulimit_max_memory_size":
-                    check_cmd = "ulimit -a 2>/dev/null"
-                    res = session.run(check_cmd, require_root=True)
-                    # 解析 ulimit -a 输出，查找 max memory size 行
-                    value = None
-                    matched_line = None
-                    for line in res.stdout.splitlines():
-                        line_lower = line.lower()
-                        if "max memory size" in line_lower:
-                            matched_line = line
-                            # 格式: "max memory size             (kbytes, -m) unlimited"
-                            # 直接取最后一列（split() 会处理多个空格）
-                            parts = line.split()
-                            if parts:
-                                value = parts[-1].strip().lower()
-                            break
-                    is_unlimited = (value == "unlimited") if value else False
-                    logger.debug("ulimit_max_memory_size检查(以root权限): 原始行='%s', 提取值='%s', 是否unlimited=%s, 结果=%s", 
-                               matched_line, value, is_unlimited, "通过" if is_unlimited else "失败")
-                    results[cmd] = is_unlimited
+                elif handler is not None:
+                    results[cmd] = handler(session)
                 elif "/" in cmd:
-                    check_cmd = f"[ -x {cmd} ] && echo OK || echo MISSING"
-                    res = session.run(check_cmd)
-                    results[cmd] = res.stdout.strip() == "OK"
+                    probe_names.append(cmd)
+                    probe_commands.append(f"[ -x {shlex.quote(cmd)} ] && echo OK || echo MISSING")
+                    results[cmd] = False
                 else:
-                    check_cmd = f"command -v {cmd} >/dev/null 2>&1 && echo OK || echo MISSING"
-                    res = session.run(check_cmd)
-                    results[cmd] = res.stdout.strip() == "OK"
+                    probe_names.append(cmd)
+                    probe_commands.append(f"command -v {shlex.quote(cmd)} >/dev/null 2>&1 && echo OK || echo MISSING")
+                    results[cmd] = False
             
-            # 获取版本信息用于比对
-            nvcc_res = session.run("/usr/local/cuda/bin/nvcc --version 2>/dev/null || true")
-            # apt list 需要 root 权限
-            apt_res = session.run("apt list --installed 2>/dev/null | grep -E '^libnccl' || true", require_root=True)
+            # 可执行文件路径、命令名的检查和 nvcc 版本查询合并为一次远程执行，nvcc 版本输出固定在最后一段
+            *probe_outputs, nvcc_output = session.run_sections(
+                probe_commands + ["/usr/local/cuda/bin/nvcc --version 2>/dev/null"]
+            )
+            for cmd, output in zip(probe_names, probe_outputs):
+                results[cmd] = output.strip() == "OK"
             
-            nvcc_version = extract_cuda_version(nvcc_res.stdout)
+            # 获取版本信息用于比对
+            nvcc_version = extract_cuda_version(nvcc_output)
             libnccl2_version = extract_nccl_version(apt_res.stdout, "libnccl2")
             libnccl_dev_version = extract_nccl_version(apt_res.stdout, "libnccl-dev")
             
@@ -1228,11 +1398,12 @@ def api_create_job():
             raise ValueError("tests不能为空")
 
         job_id = payload.get("jobName") or f"manual-{uuid.uuid4().hex[:8]}"
+        now = utc_now()
         job = {
             "jobId": job_id,
             "jobName": payload.get("jobName") or job_id,
-            "createdAt": utc_now(),
-            "updatedAt": utc_now(),
+            "createdAt": now,
+            "updatedAt": now,
             "status": "pending",
             "tests": tests,
             "dcgmLevel": dcgm_level,
@@ -1262,7 +1433,10 @@ def api_create_job():
             job["nodes"].append(node_entry)
 
         with jobs_lock:
+            if job_id in active_job_ids:
+                raise ValueError(f"任务 {job_id} 正在执行中，请使用其他任务名称")
             jobs[job_id] = job
+            active_job_ids.add(job_id)
 
         start_job_worker(job_id)
         return json_response(True, data={"jobId": job_id}, message="Job已创建")
@@ -1275,9 +1449,11 @@ def api_create_job():
 def api_get_job(job_id: str):
     with jobs_lock:
         job = jobs.get(job_id)
-        if not job:
-            return json_response(False, message="未找到Job", status=404)
-        return json_response(True, data=sanitize_job(job))
+        data = sanitize_job(job) if job else None
+    # 序列化放在锁外，避免较大的执行日志阻塞工作线程更新状态
+    if data is None:
+        return json_response(False, message="未找到Job", status=404)
+    return conditional_json_response(data)
 
 
 @app.route("/api/gpu-inspection/jobs", methods=["GET"])
@@ -1287,9 +1463,23 @@ def api_list_jobs():
     return json_response(True, data=data)
 
 
+@dataclass
+class TrustNodeInfo:
+    """SSH互信配置中公钥收集成功的节点"""
+    connection: Dict[str, Any]
+    internal_ip: str
+    pubkey: str
+    display_name: str
+    idx: int
+    # 第一步建立的会话，供第二、三步复用
+    session: SSHSession
+
+
 @app.route("/api/gpu-inspection/setup-ssh-trust", methods=["POST"])
 def api_setup_ssh_trust():
     """配置多节点间SSH免密互信"""
+    # 第一步建立的SSH会话保持打开，供第二、三步复用，请求结束时统一关闭
+    sessions = ExitStack()
     try:
         payload = request.get_json(force=True)
         nodes = payload.get("nodes", [])  # 节点连接信息列表
@@ -1298,101 +1488,132 @@ def api_setup_ssh_trust():
             raise ValueError("至少需要2个节点来配置SSH互信")
         
         results = []
-        node_info = []  # 存储每个节点的信息：{connection, internal_ip, pubkey, display_name}
+        node_info: List[TrustNodeInfo] = []
         
         # 第一步：收集所有节点的公钥和内网IP
         logger.info("开始收集 %d 个节点的SSH公钥和内网IP", len(nodes))
-        for idx, node in enumerate(nodes):
+        def collect_node_key(idx: int, node: Dict[str, Any]) -> tuple[Optional[TrustNodeInfo], Dict[str, Any]]:
             host = node.get("host")
             port = node.get("port", 22)
             display_name = f"{host}:{port}"
             
             try:
-                with SSHSession(node) as session:
-                    # 确保 .ssh 目录存在
-                    session.run("mkdir -p /root/.ssh && chmod 700 /root/.ssh", require_root=True)
-                    
-                    # 获取内网IP
-                    internal_ip_res = session.run("ip route get 1.1.1.1 2>/dev/null | grep -oP 'src \\K[0-9.]+' | head -n 1 || hostname -I | awk '{print $1}'")
-                    internal_ip = internal_ip_res.stdout.strip()
+                with ExitStack() as node_stack:
+                    session = node_stack.enter_context(SSHSession(node))
+                    # 一次远程执行完成：确保 .ssh 目录存在、获取内网IP、没有密钥则生成、读取公钥
+                    collect_res = session.run(SSH_TRUST_COLLECT_SCRIPT, require_root=True)
+                    fields = dict(
+                        line.split("=", 1) for line in collect_res.stdout.splitlines() if line.startswith("GHX_") and "=" in line
+                    )
+                    internal_ip = fields.get("GHX_INTERNAL_IP", "").strip()
                     if not internal_ip:
                         raise RuntimeError("无法获取内网IP")
-                    
-                    # 检查是否已有密钥，没有则生成
-                    check_key = session.run("[ -f /root/.ssh/id_rsa ] && echo EXISTS || echo MISSING", require_root=True)
-                    if check_key.stdout.strip() == "MISSING":
+                    if "GHX_KEY_GENERATED" in fields:
                         logger.info("为节点 %s (内网IP: %s) 生成SSH密钥对", display_name, internal_ip)
-                        session.run("ssh-keygen -t rsa -b 2048 -f /root/.ssh/id_rsa -N '' -q", require_root=True)
                     
-                    # 获取公钥
-                    pubkey_result = session.run("cat /root/.ssh/id_rsa.pub", require_root=True)
-                    if pubkey_result.exit_code == 0 and pubkey_result.stdout.strip():
-                        node_info.append({
-                            "connection": node,
-                            "internal_ip": internal_ip,
-                            "pubkey": pubkey_result.stdout.strip(),
-                            "display_name": display_name,
-                            "idx": idx,
-                        })
-                        results.append({"host": display_name, "internalIp": internal_ip, "status": "pubkey_collected", "message": f"公钥已收集 (内网: {internal_ip})"})
+                    pubkey = fields.get("GHX_PUBKEY", "").strip()
+                    if collect_res.exit_code == 0 and pubkey:
                         logger.info("节点 %s 公钥已收集，内网IP: %s", display_name, internal_ip)
-                    else:
-                        results.append({"host": display_name, "status": "error", "message": "无法获取公钥"})
+                        info = TrustNodeInfo(
+                            connection=node,
+                            internal_ip=internal_ip,
+                            pubkey=pubkey,
+                            display_name=display_name,
+                            idx=idx,
+                            session=session,
+                        )
+                        # 采集成功的会话不在此关闭，转交给请求级的 sessions
+                        node_stack.pop_all()
+                        return info, {"host": display_name, "internalIp": internal_ip, "status": "pubkey_collected", "message": f"公钥已收集 (内网: {internal_ip})"}
+                    return None, {"host": display_name, "status": "error", "message": "无法获取公钥"}
             except Exception as exc:
                 logger.error("收集节点 %s 公钥失败: %s", display_name, exc)
-                results.append({"host": display_name, "status": "error", "message": str(exc)})
+                return None, {"host": display_name, "status": "error", "message": str(exc)}
+        
+        # 各节点并发收集；executor.map 按提交顺序返回，第一个节点仍作为第三步连接测试的发起方
+        with ThreadPoolExecutor(max_workers=min(len(nodes), 10)) as executor:
+            collected = list(executor.map(collect_node_key, range(len(nodes)), nodes))
+        for info, result in collected:
+            if info is not None:
+                sessions.push(info.session)
+                node_info.append(info)
+            results.append(result)
         
         if len(node_info) < 2:
             return json_response(False, message=f"成功收集的公钥数量不足({len(node_info)}个)，无法配置互信", data={"results": results}, status=400)
         
+        # 按主机索引结果，后续步骤直接定位（同一主机重复出现时以首条为准，与原先的顺序查找一致）
+        results_by_host: Dict[str, Dict[str, Any]] = {}
+        for r in results:
+            results_by_host.setdefault(r["host"], r)
+        
         # 第二步：将所有公钥分发到所有节点
         logger.info("开始分发公钥到 %d 个节点", len(node_info))
-        authorized_keys_content = "\n".join([n["pubkey"] for n in node_info])
-        all_internal_ips = [n["internal_ip"] for n in node_info]
+        authorized_keys_content = "\n".join([n.pubkey for n in node_info])
+        all_internal_ips = [n.internal_ip for n in node_info]
         
-        for info in node_info:
-            display_name = info["display_name"]
-            try:
-                with SSHSession(info["connection"]) as session:
-                    # 写入 authorized_keys
-                    escaped_content = authorized_keys_content.replace("'", "'\\''")
-                    session.run(f"echo '{escaped_content}' > /root/.ssh/authorized_keys && chmod 600 /root/.ssh/authorized_keys", require_root=True)
-                    
-                    # 配置 ssh_config 禁用 StrictHostKeyChecking
-                    session.run("grep -q 'StrictHostKeyChecking' /etc/ssh/ssh_config || echo 'StrictHostKeyChecking no' >> /etc/ssh/ssh_config", require_root=True)
-                    
-                    # 预填充 known_hosts（使用内网IP扫描所有节点）
-                    all_ips_str = " ".join(all_internal_ips)
-                    session.run(f"ssh-keyscan -t rsa {all_ips_str} >> /root/.ssh/known_hosts 2>/dev/null; sort -u /root/.ssh/known_hosts -o /root/.ssh/known_hosts", require_root=True)
-                    
+        escaped_content = authorized_keys_content.replace("'", "'\\''")
+        all_ips_str = " ".join(all_internal_ips)
+        distribute_commands = [
+            # 写入 authorized_keys
+            f"echo '{escaped_content}' > /root/.ssh/authorized_keys && chmod 600 /root/.ssh/authorized_keys",
+            # 配置 ssh_config 禁用 StrictHostKeyChecking
+            "grep -q 'StrictHostKeyChecking' /etc/ssh/ssh_config || echo 'StrictHostKeyChecking no' >> /etc/ssh/ssh_config",
+            # 预填充 known_hosts（使用内网IP扫描所有节点）
+            f"ssh-keyscan -t rsa {all_ips_str} >> /root/.ssh/known_hosts 2>/dev/null; sort -u /root/.ssh/known_hosts -o /root/.ssh/known_hosts",
+        ]
+        # 合并为一次远程执行；与原先分别执行一样，某条命令失败不影响后续命令
+        distribute_script = "; ".join(f"{{ {cmd}; }} || true" for cmd in distribute_commands)
+        
+        def distribute_keys(info: TrustNodeInfo) -> None:
+            info.session.run(distribute_script, require_root=True)
+        
+        # 各节点分发互不依赖，并发执行；结果在主线程中汇总
+        with ThreadPoolExecutor(max_workers=min(len(node_info), 10)) as executor:
+            future_to_info = {executor.submit(distribute_keys, info): info for info in node_info}
+            for future in as_completed(future_to_info):
+                info = future_to_info[future]
+                display_name = info.display_name
+                try:
+                    future.result()
                     # 更新结果
-                    for r in results:
-                        if r["host"] == display_name:
-                            r["status"] = "success"
-                            r["message"] = f"SSH互信配置完成 (内网: {info['internal_ip']})"
-                            break
+                    results_by_host[display_name].update(status="success", message=f"SSH互信配置完成 (内网: {info.internal_ip})")
                     logger.info("节点 %s SSH互信配置完成", display_name)
-            except Exception as exc:
-                logger.error("配置节点 %s SSH互信失败: %s", display_name, exc)
-                for r in results:
-                    if r["host"] == display_name:
-                        r["status"] = "error"
-                        r["message"] = f"分发公钥失败: {exc}"
-                        break
+                except Exception as exc:
+                    logger.error("配置节点 %s SSH互信失败: %s", display_name, exc)
+                    results_by_host[display_name].update(status="error", message=f"分发公钥失败: {exc}")
         
         # 第三步：从第一个节点测试到其他节点的SSH连接
         logger.info("开始从第一个节点测试到其他节点的SSH连接")
         first_node_info = node_info[0]
         test_failures = []
         
-        for info in node_info[1:]:  # 从第二个节点开始测试
-            display_name = info["display_name"]
-            target_internal_ip = info["internal_ip"]
-            try:
-                with SSHSession(first_node_info["connection"]) as session:
-                    # 从第一个节点SSH连接到目标节点，测试连接是否成功
-                    test_cmd = f"ssh -o StrictHostKeyChecking=no -o ConnectTimeout=10 -o BatchMode=yes {target_internal_ip} 'echo SSH_TEST_OK' 2>&1"
-                    test_result = session.run(test_cmd, timeout=15, require_root=True)
+        def record_test_exception(info: TrustNodeInfo, exc: Exception) -> None:
+            display_name = info.display_name
+            logger.exception("测试从第一个节点到节点 %s 的SSH连接时发生异常: %s", display_name, exc)
+            error_msg = str(exc)
+            test_failures.append((display_name, info.internal_ip, error_msg))
+            # 更新结果状态为警告
+            results_by_host[display_name].update(status="warning", message=f"连接测试异常: {error_msg}")
+        
+        # 所有测试都从第一个节点发起，复用第一步建立的会话，避免每个目标节点重复握手认证
+        session = first_node_info.session
+        
+        def run_connection_test(info: TrustNodeInfo) -> SSHCommandResult:
+            # 从第一个节点SSH连接到目标节点，测试连接是否成功
+            test_cmd = f"ssh -o StrictHostKeyChecking=no -o ConnectTimeout=10 -o BatchMode=yes {info.internal_ip} 'echo SSH_TEST_OK' 2>&1"
+            return session.run(test_cmd, timeout=15, require_root=True)
+        
+        # 各目标节点的测试互不依赖，在同一连接上各开通道并发执行（并发数不超过 sshd 默认 MaxSessions=10）；
+        # 结果按节点顺序在主线程中汇总
+        target_infos = node_info[1:]  # 从第二个节点开始测试
+        with ThreadPoolExecutor(max_workers=min(len(target_infos), 10)) as executor:
+            futures = [executor.submit(run_connection_test, info) for info in target_infos]
+            for info, future in zip(target_infos, futures):
+                display_name = info.display_name
+                target_internal_ip = info.internal_ip
+                try:
+                    test_result = future.result()
                     
                     if test_result.exit_code == 0 and "SSH_TEST_OK" in test_result.stdout:
                         logger.info("从第一个节点到节点 %s (内网IP: %s) SSH连接测试成功", display_name, target_internal_ip)
@@ -1411,24 +1632,13 @@ def api_setup_ssh_trust():
                             else:
                                 clean_error = "Permission denied - 权限被拒绝"
                         # 更新结果状态为警告
-                        for r in results:
-                            if r["host"] == display_name:
-                                r["status"] = "warning"
-                                r["message"] = f"连接测试失败: {clean_error}"
-                                break
-            except Exception as exc:
-                logger.exception("测试从第一个节点到节点 %s 的SSH连接时发生异常: %s", display_name, exc)
-                error_msg = str(exc)
-                test_failures.append((display_name, target_internal_ip, error_msg))
-                # 更新结果状态为警告
-                for r in results:
-                    if r["host"] == display_name:
-                        r["status"] = "warning"
-                        r["message"] = f"连接测试异常: {error_msg}"
-                        break
+                        results_by_host[display_name].update(status="warning", message=f"连接测试失败: {clean_error}")
+                except Exception as exc:
+                    record_test_exception(info, exc)
         
-        success_count = sum(1 for r in results if r["status"] == "success")
-        warning_count = sum(1 for r in results if r["status"] == "warning")
+        status_counts = Counter(r["status"] for r in results)
+        success_count = status_counts["success"]
+        warning_count = status_counts["warning"]
         
         # 如果有连接测试失败，返回警告信息
         if test_failures:
@@ -1449,11 +1659,15 @@ def api_setup_ssh_trust():
     except Exception as exc:
         logger.exception("配置SSH互信失败: %s", exc)
         return json_response(False, message=str(exc), status=400)
+    finally:
+        sessions.close()
 
 
 # 多机测试任务存储（类似 jobs，但结构更简单）
 multi_node_tests: Dict[str, Dict[str, Any]] = {}
 multi_node_tests_lock = threading.Lock()
+# 状态查询中仅在有值时返回的字段
+MULTI_NODE_OPTIONAL_FIELDS = ("startedAt", "completedAt", "result", "error")
 
 
 def run_multi_node_nccl_task(test_id: str, payload: Dict[str, Any]):
@@ -1473,7 +1687,7 @@ def run_multi_node_nccl_task(test_id: str, payload: Dict[str, Any]):
         
         # 解析hosts
         if hostfile_content:
-            host_list = [h.strip() for h in hostfile_content.strip().split('\n') if h.strip()]
+            host_list = parse_hostfile_hosts(hostfile_content)
         elif hosts:
             host_list = hosts
         else:
@@ -1560,39 +1774,7 @@ def run_multi_node_nccl_task(test_id: str, payload: Dict[str, Any]):
                 session.upload(nccl_tgz, remote_nccl_tgz)
                 session.upload(nccl_tests_tgz, remote_nccl_tests_tgz)
                 
-                compile_script = """
-set -e
-rm -rf /tmp/ghx/nccl /tmp/ghx/nccl-tests
-echo "解压 nccl.tgz..."
-tar -xzf /tmp/ghx/nccl.tgz -C /tmp/ghx
-rm -f /tmp/ghx/nccl.tgz
-echo "编译 nccl..."
-cd /tmp/ghx/nccl
-make -j$(nproc) CUDA_HOME=/usr/local/cuda 2>&1 | tee /tmp/nccl_build.log
-if [ $? -ne 0 ]; then
-    echo "错误: nccl 编译失败"
-    cat /tmp/nccl_build.log
-    exit 1
-fi
-export NCCL_HOME=/tmp/ghx/nccl
-echo "解压 nccl-tests.tgz..."
-tar -xzf /tmp/ghx/nccl-tests.tgz -C /tmp/ghx
-rm -f /tmp/ghx/nccl-tests.tgz
-echo "编译 nccl-tests..."
-cd /tmp/ghx/nccl-tests
-make -j$(nproc) CUDA_HOME=/usr/local/cuda NCCL_HOME=$NCCL_HOME 2>&1 | tee /tmp/nccl_tests_build.log
-if [ $? -ne 0 ]; then
-    echo "错误: nccl-tests 编译失败"
-    cat /tmp/nccl_tests_build.log
-    exit 1
-fi
-if [ ! -f /tmp/ghx/nccl-tests/build/all_reduce_perf ]; then
-    echo "错误: /tmp/ghx/nccl-tests/build/all_reduce_perf 不存在"
-    exit 1
-fi
-chmod +x /tmp/ghx/nccl-tests/build/all_reduce_perf
-echo "编译完成"
-"""
+                compile_script = build_nccl_compile_script()
                 compile_result = session.run(compile_script, timeout=600, require_root=True)
                 if compile_result.exit_code != 0:
                     raise RuntimeError(f"编译失败: {compile_result.stderr or compile_result.stdout}")
@@ -1603,7 +1785,34 @@ echo "编译完成"
             
             # 为所有其他节点上传源码并编译
             master_host = host_list[0]
-            other_hosts = host_list[1:]
+            # 同一主机只编译一次：hostfile 中重复出现的主机（包括主节点自身）会并发解压编译到同一目录，互相覆盖
+            other_hosts = [host for host in dict.fromkeys(host_list[1:]) if host != master_host]
+            
+            if other_hosts:
+                # 先检查各节点是否已有 nccl-tests，只为缺少的节点上传源码并编译
+                # 所有节点的检查合并为主节点上的一次远程执行，由远程 shell 后台并发 ssh
+                hosts_arg = " ".join(shlex.quote(host) for host in other_hosts)
+                check_script = f"""
+for host in {hosts_arg}; do
+    ( ssh -n -o StrictHostKeyChecking=no -o ConnectTimeout=10 "$host" "[ -f /tmp/ghx/nccl-tests/build/all_reduce_perf ]" 2>/dev/null && echo "GHX_HAS_NCCL_TESTS=$host" ) &
+done
+wait
+"""
+                try:
+                    check_result = session.run(check_script, timeout=60, require_root=True)
+                    existing_hosts = {
+                        line.split("=", 1)[1].strip()
+                        for line in check_result.stdout.splitlines()
+                        if line.startswith("GHX_HAS_NCCL_TESTS=")
+                    }
+                except Exception as exc:
+                    # 检查失败时按全部缺少处理，由编译步骤给出具体错误
+                    logger.warning("检查节点 nccl-tests 失败: %s", exc)
+                    existing_hosts = set()
+                for host in other_hosts:
+                    if host in existing_hosts:
+                        logger.info("节点 %s 已存在 nccl-tests，跳过编译", host)
+                other_hosts = [host for host in other_hosts if host not in existing_hosts]
             
             if other_hosts:
                 logger.info("开始为其他 %d 个节点并发上传源码并编译 nccl-tests", len(other_hosts))
@@ -1618,16 +1827,8 @@ echo "编译完成"
                 
                 def upload_and_compile_node(host: str) -> tuple[str, bool, str]:
                     try:
-                        # 先检查节点是否已有 nccl-tests
-                        check_script = f"""
-ssh -o StrictHostKeyChecking=no -o ConnectTimeout=10 {host} "[ -f /tmp/ghx/nccl-tests/build/all_reduce_perf ] && echo OK || echo MISSING" 2>/dev/null || echo "MISSING"
-"""
-                        check_result = session.run(check_script, timeout=30, require_root=True)
-                        if check_result.stdout.strip() == "OK":
-                            logger.info("节点 %s 已存在 nccl-tests，跳过编译", host)
-                            return (host, True, "")
-                        
                         logger.info("开始为节点 %s 上传源码并编译 nccl-tests", host)
+                        remote_compile_script = build_nccl_compile_script(done_message=f"节点 {host} 编译完成")
                         upload_and_compile_script = f"""
 set -e
 echo "上传源码到节点 {host}..."
@@ -1635,38 +1836,7 @@ ssh -o StrictHostKeyChecking=no -o ConnectTimeout=10 {host} "mkdir -p /tmp/ghx"
 scp -o StrictHostKeyChecking=no -o ConnectTimeout=10 {temp_nccl_path} {host}:/tmp/ghx/nccl.tgz || exit 1
 scp -o StrictHostKeyChecking=no -o ConnectTimeout=10 {temp_nccl_tests_path} {host}:/tmp/ghx/nccl-tests.tgz || exit 1
 ssh -o StrictHostKeyChecking=no -o ConnectTimeout=10 {host} << 'REMOTE_SCRIPT'
-set -e
-rm -rf /tmp/ghx/nccl /tmp/ghx/nccl-tests
-echo "解压 nccl.tgz..."
-tar -xzf /tmp/ghx/nccl.tgz -C /tmp/ghx
-rm -f /tmp/ghx/nccl.tgz
-echo "编译 nccl..."
-cd /tmp/ghx/nccl
-make -j$(nproc) CUDA_HOME=/usr/local/cuda 2>&1 | tee /tmp/nccl_build.log
-if [ $? -ne 0 ]; then
-    echo "错误: nccl 编译失败"
-    cat /tmp/nccl_build.log
-    exit 1
-fi
-export NCCL_HOME=/tmp/ghx/nccl
-echo "解压 nccl-tests.tgz..."
-tar -xzf /tmp/ghx/nccl-tests.tgz -C /tmp/ghx
-rm -f /tmp/ghx/nccl-tests.tgz
-echo "编译 nccl-tests..."
-cd /tmp/ghx/nccl-tests
-make -j$(nproc) CUDA_HOME=/usr/local/cuda NCCL_HOME=$NCCL_HOME 2>&1 | tee /tmp/nccl_tests_build.log
-if [ $? -ne 0 ]; then
-    echo "错误: nccl-tests 编译失败"
-    cat /tmp/nccl_tests_build.log
-    exit 1
-fi
-if [ ! -f /tmp/ghx/nccl-tests/build/all_reduce_perf ]; then
-    echo "错误: /tmp/ghx/nccl-tests/build/all_reduce_perf 不存在"
-    exit 1
-fi
-chmod +x /tmp/ghx/nccl-tests/build/all_reduce_perf
-echo "节点 {host} 编译完成"
-REMOTE_SCRIPT
+{remote_compile_script}REMOTE_SCRIPT
 if [ $? -eq 0 ]; then
     echo "节点 {host} 编译成功"
 else
@@ -1787,17 +1957,10 @@ def api_get_multi_node_nccl_status(test_id: str):
             "status": test["status"],
             "createdAt": test["createdAt"],
         }
-        
-        if test.get("startedAt"):
-            result_data["startedAt"] = test["startedAt"]
-        if test.get("completedAt"):
-            result_data["completedAt"] = test["completedAt"]
-        if test.get("result"):
-            result_data["result"] = test["result"]
-        if test.get("error"):
-            result_data["error"] = test["error"]
-        
-        return json_response(True, data=result_data)
+        result_data.update((field, test[field]) for field in MULTI_NODE_OPTIONAL_FIELDS if test.get(field))
+    
+    # 结果中包含完整的 mpirun 输出，序列化放在锁外
+    return conditional_json_response(result_data)
 
 
 @app.route("/api/gpu-inspection/stop-job/<job_id>", methods=["POST"])
@@ -1819,32 +1982,40 @@ def api_stop_job(job_id: str):
                 job["cancelled"] = threading.Event()
                 job["cancelled"].set()
             
+            # 同一批状态更新共用一个时间戳
+            now = utc_now()
             # 如果任务状态是 running，立即更新为 cancelled（不再使用 cancelling 中间状态）
             # 这样可以避免前端一直显示"取消中"
             if job["status"] == "running":
                 job["status"] = "cancelled"
-                job["updatedAt"] = utc_now()
+                job["updatedAt"] = now
                 # 更新所有运行中的节点状态为 cancelled
                 for node in job.get("nodes", []):
                     if node["status"] == "running":
                         node["status"] = "cancelled"
                         if not node.get("completedAt"):
-                            node["completedAt"] = utc_now()
+                            node["completedAt"] = now
                 logger.info("任务 %s 已立即标记为取消，共 %d 个节点", job_id, len([n for n in job.get("nodes", []) if n["status"] == "cancelled"]))
             elif job["status"] == "cancelling":
                 # 如果已经是 cancelling，直接更新为 cancelled
                 job["status"] = "cancelled"
-                job["updatedAt"] = utc_now()
+                job["updatedAt"] = now
                 for node in job.get("nodes", []):
                     if node["status"] == "cancelling":
                         node["status"] = "cancelled"
                         if not node.get("completedAt"):
-                            node["completedAt"] = utc_now()
+                            node["completedAt"] = now
                 logger.info("任务 %s 从 cancelling 更新为 cancelled", job_id)
             else:
-                # pending 状态，更新为 cancelling（任务还没开始）
-                job["status"] = "cancelling"
-                job["updatedAt"] = utc_now()
+                # pending 状态（任务还没开始，可能在排队等待执行槽位）：直接更新为 cancelled，
+                # 工作线程拿到槽位后检查到取消标志会跳过执行
+                job["status"] = "cancelled"
+                job["updatedAt"] = now
+                for node in job.get("nodes", []):
+                    if node["status"] in ("pending", "cancelling"):
+                        node["status"] = "cancelled"
+                        if not node.get("completedAt"):
+                            node["completedAt"] = now
                 logger.info("任务 %s 已标记为取消（pending状态）", job_id)
         
         return json_response(True, data={"jobId": job_id}, message="任务停止请求已发送")
@@ -1853,6 +2024,61 @@ def api_stop_job(job_id: str):
         return json_response(False, message=str(exc), status=500)
 
 
+# -----------------------------------------------------------------------------
+# 过期任务清理
+# -----------------------------------------------------------------------------
+
+
+def is_expired(timestamp: Optional[str], cutoff: datetime) -> bool:
+    if not timestamp:
+        return False
+    try:
+        return datetime.fromisoformat(timestamp) < cutoff
+    except ValueError:
+        return False
+
+
+def cleanup_finished_jobs() -> None:
+    """移除结束时间早于保留期限的Job和多机测试，避免长期运行时内存无限增长"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=FINISHED_JOB_TTL_SECONDS)
+    with jobs_lock:
+        expired_jobs = [
+            job_id for job_id, job in jobs.items()
+            # 已取消但工作线程尚未退出的Job仍在 active_job_ids 中，暂不清理
+            if job.get("status") in FINISHED_JOB_STATUSES
+            and job_id not in active_job_ids
+            and is_expired(job.get("updatedAt"), cutoff)
+        ]
+        for job_id in expired_jobs:
+            del jobs[job_id]
+    with multi_node_tests_lock:
+        expired_tests = [
+            test_id for test_id, test in multi_node_tests.items()
+            if test.get("status") in FINISHED_JOB_STATUSES and is_expired(test.get("completedAt"), cutoff)
+        ]
+        for test_id in expired_tests:
+            del multi_node_tests[test_id]
+    if expired_jobs or expired_tests:
+        logger.info("已清理过期任务: %d 个Job, %d 个多机测试", len(expired_jobs), len(expired_tests))
+
+
+def run_cleanup_loop() -> None:
+    while True:
+        time.sleep(FINISHED_JOB_CLEANUP_INTERVAL)
+        try:
+            cleanup_finished_jobs()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("清理过期任务失败: %s", exc)
+
+
+def start_cleanup_worker() -> None:
+    if FINISHED_JOB_TTL_SECONDS <= 0:
+        logger.info("未启用过期任务清理 (GHX_FINISHED_JOB_TTL=%d)", FINISHED_JOB_TTL_SECONDS)
+        return
+    threading.Thread(target=run_cleanup_loop, name="ghx-job-cleanup", daemon=True).start()
+
+
 if __name__ == "__main__":
+    start_cleanup_worker()
     app.run(host="0.0.0.0", port=5000, debug=False)
 
@@ -209,6 +209,12 @@ const downloadBlob = (filename: string, blob: Blob) => {
 
 const API_BASE_URL = getApiBaseUrl()
 const LANGUAGE_STORAGE_KEY = "ghx-language"
+// 任务状态轮询：正常间隔；连续失败时指数退避，直到上限
+const JOB_POLL_INTERVAL_MS = 4000
+const JOB_POLL_MAX_INTERVAL_MS = 30000
+// 多机测试运行中的轮询间隔随已运行时长增长（约为已运行时长的1/10），编译+测试通常持续数分钟
+const MULTI_NODE_POLL_MIN_MS = 2000
+const MULTI_NODE_POLL_MAX_MS = 10000
 
 async function apiRequest<T>(path: string, options: RequestInit = {}): Promise<T> {
   const base = API_BASE_URL
@@ -1406,6 +1412,7 @@ export default function BareMetal() {
       
       // 轮询任务状态（在后台进行）
       const pollStatus = async () => {
+        const startedAt = Date.now()
         try {
           while (!abortController.signal.aborted) {
             try {
@@ -1448,8 +1455,10 @@ export default function BareMetal() {
                 })
                 break
               } else if (statusResult.status === "running") {
-                // 继续等待
-                await new Promise(resolve => setTimeout(resolve, 2000)) // 每2秒轮询一次
+                // 继续等待，运行越久轮询越稀疏，检测延迟保持在运行时长的一小部分
+                const elapsed = Date.now() - startedAt
+                const delay = Math.min(Math.max(elapsed / 10, MULTI_NODE_POLL_MIN_MS), MULTI_NODE_POLL_MAX_MS)
+                await new Promise(resolve => setTimeout(resolve, delay))
               } else {
                 // pending状态，继续等待
                 await new Promise(resolve => setTimeout(resolve, 1000)) // 每1秒轮询一次
@@ -1503,12 +1512,15 @@ export default function BareMetal() {
   useEffect(() => {
     if (!currentJobId) return
     let cancelled = false
+    let errorStreak = 0
+    let timer: ReturnType<typeof setTimeout> | undefined
 
     const poll = async () => {
       if (cancelled) return
       try {
         const data = await apiRequest<JobDetail>(`/api/gpu-inspection/job/${currentJobId}`)
         if (cancelled) return
+        errorStreak = 0
         setCurrentJob(data)
         if (data.status === "completed" || data.status === "failed" || data.status === "cancelled") {
           setIsPollingJob(false)
@@ -1539,6 +1551,8 @@ export default function BareMetal() {
           return
         }
       } catch (error) {
+        if (cancelled) return
+        errorStreak += 1
         if (!pollErrorOnceRef.current) {
           toast({
             title: tr("获取任务状态失败", "Failed to get job status"),
@@ -1548,13 +1562,15 @@ export default function BareMetal() {
           pollErrorOnceRef.current = true
         }
       }
-      setTimeout(poll, 4000)
+      const delay = Math.min(JOB_POLL_INTERVAL_MS * 2 ** errorStreak, JOB_POLL_MAX_INTERVAL_MS)
+      timer = setTimeout(poll, delay)
   }
 
     poll()
 
     return () => {
       cancelled = true
+      if (timer) clearTimeout(timer)
     }
   }, [currentJobId, toast])
 
@@ -8,13 +8,26 @@ K8s CronJob使用的GPU检查脚本，运行检查并将结果写入共享PVC
 import json
 import subprocess
 import os
+import socket
 import sys
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
 import logging
 
 BENCHMARKS_CONFIG_PATH = '/config/gpu-benchmarks.json'
 
+# nvidia-smi 输出的GPU名称中用于识别型号的关键字（按匹配优先级排列）
+GPU_TYPE_KEYWORDS = ('H200', 'H100', 'H800', 'A100', 'A800', 'L40S', 'RTX 3090', 'RTX 4090')
+
+# DCGM诊断各级别的超时时间（秒）
+DCGM_DIAG_TIMEOUTS = {
+    1: 1800,  # 级别1: 30分钟
+    2: 3600,  # 级别2: 1小时
+    3: 7200,  # 级别3: 2小时
+    4: 14400  # 级别4: 4小时
+}
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -46,13 +59,16 @@ GPU_BENCHMARKS = {
 
 def load_benchmarks_from_config():
     """从配置文件加载GPU基准值"""
-    if os.path.exists(BENCHMARKS_CONFIG_PATH):
-        try:
-            with open(BENCHMARKS_CONFIG_PATH, 'r', encoding='utf-8') as f:
-                config_benchmarks = json.load(f)
-                GPU_BENCHMARKS.update(config_benchmarks)
-        except Exception as e:
-            logger.error(f"加载GPU基准值失败: {e}")
+    try:
+        # utf-8-sig 兼容带 BOM 的配置文件
+        with open(BENCHMARKS_CONFIG_PATH, 'r', encoding='utf-8-sig') as f:
+            config_benchmarks = json.load(f)
+            GPU_BENCHMARKS.update(config_benchmarks)
+    except FileNotFoundError:
+        # 配置文件不存在时使用内置基准值
+        pass
+    except Exception as e:
+        logger.error("加载GPU基准值失败: %s", e)
 
 load_benchmarks_from_config()
 
@@ -102,6 +118,8 @@ class GPULogCollector:
     def __init__(self):
         self.logs = []
         self.start_time = datetime.now()
+        # 耗时用单调时钟计算，不受NTP校时等系统时间调整影响
+        self._start_monotonic = time.monotonic()
     
     def add_log(self, message: str):
         """添加日志"""
@@ -115,7 +133,7 @@ class GPULogCollector:
     
     def get_execution_time(self) -> str:
         """获取执行时间"""
-        duration = datetime.now() - self.start_time
+        duration = timedelta(seconds=time.monotonic() - self._start_monotonic)
         return str(duration)
 
 class GPUChecker:
@@ -156,15 +174,18 @@ class GPUChecker:
             # 确保目录存在
             os.makedirs(save_dir, exist_ok=True)
             
+            # 只序列化一次，时间戳文件和latest文件写入相同内容
+            content = json.dumps(result, indent=2, ensure_ascii=False)
+            
             # 写入时间戳文件
             filepath = os.path.join(save_dir, filename)
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
+                f.write(content)
             
             # 写入latest文件
             latest_file = os.path.join(save_dir, latest_filename)
             with open(latest_file, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
+                f.write(content)
             
             # 不保存到数据库，只保存到PVC，由gpu-cli服务负责入库
             print(f"结果已保存到PVC目录: {save_dir}")
@@ -183,30 +204,16 @@ class GPUChecker:
                                   capture_output=True, text=True, timeout=30)
             if result.returncode == 0:
                 gpu_name = result.stdout.strip().split('\n')[0]
-                # 简化GPU名称匹配
-                if 'H200' in gpu_name:
-                    return 'H200'
-                elif 'H100' in gpu_name:
-                    return 'H100'
-                elif 'H800' in gpu_name:
-                    return 'H800'
-                elif 'A100' in gpu_name:
-                    return 'A100'
-                elif 'A800' in gpu_name:
-                    return 'A800'
-                elif 'L40S' in gpu_name:
-                    return 'L40S'
-                elif 'RTX 3090' in gpu_name:
-                    return 'RTX 3090'
-                elif 'RTX 4090' in gpu_name:
-                    return 'RTX 4090'
-                else:
-                    return gpu_name
+                # 简化GPU名称匹配，按 GPU_TYPE_KEYWORDS 顺序取第一个命中的型号
+                for gpu_type in GPU_TYPE_KEYWORDS:
+                    if gpu_type in gpu_name:
+                        return gpu_type
+                return gpu_name
             else:
-                logger.error(f"获取GPU类型失败: {result.stderr}")
+                logger.error("获取GPU类型失败: %s", result.stderr)
                 return "Unknown"
         except Exception as e:
-            logger.error(f"获取GPU类型异常: {e}")
+            logger.error("获取GPU类型异常: %s", e)
             return "Unknown"
 
     def run_bandwidth_test(self) -> Dict[str, Any]:
@@ -456,13 +463,8 @@ class GPUChecker:
                                         continue
                 
                 # 根据参考代码：移除对角线元素（每9个元素移除第1个）
-                if p2plist:
-                    j = 0
-                    for i in range(len(p2plist)):
-                        if i % 9 == 0:
-                            if i - j < len(p2plist):
-                                p2plist.pop(i - j)
-                                j += 1
+                # 一次遍历过滤，避免在循环中反复 pop 导致的元素搬移
+                p2plist = [value for i, value in enumerate(p2plist) if i % 9 != 0]
                 
                 if p2plist:
                     # 根据参考代码：返回最小值
@@ -609,26 +611,12 @@ class GPUChecker:
             self.log_collector.add_log(f"=== 开始DCGM诊断，级别: {self.config['dcgm_level']} ===")
             sys.stdout.flush()
             
-            # 根据级别设置合理的超时时间
-            dcgm_timeouts = {
-                1: 1800,  # 级别1: 30分钟
-                2: 3600,  # 级别2: 1小时
-                3: 7200,  # 级别3: 2小时
-                4: 14400  # 级别4: 4小时
-            }
-            timeout = dcgm_timeouts.get(self.config["dcgm_level"], 1800)
-            
-            # 根据级别运行DCGM诊断
-            if self.config["dcgm_level"] == 1:
-                cmd = "dcgmi diag -r 1"
-            elif self.config["dcgm_level"] == 2:
-                cmd = "dcgmi diag -r 2"
-            elif self.config["dcgm_level"] == 3:
-                cmd = "dcgmi diag -r 3"
-            elif self.config["dcgm_level"] == 4:
-                cmd = "dcgmi diag -r 4"
-            else:
-                cmd = "dcgmi diag -r 1"
+            # 根据级别运行DCGM诊断并设置超时时间，不支持的级别按级别1执行
+            level = self.config["dcgm_level"]
+            if level not in DCGM_DIAG_TIMEOUTS:
+                level = 1
+            timeout = DCGM_DIAG_TIMEOUTS[level]
+            cmd = f"dcgmi diag -r {level}"
             
             print(f"开始执行DCGM诊断命令: {cmd}")
             self.log_collector.add_log(f"开始执行DCGM诊断命令: {cmd}")
@@ -807,7 +795,7 @@ class GPUChecker:
         self.log_collector.add_log(f"开始运行选定的GPU检查测试: {self.config.get('enabled_tests_original', self.config['enabled_tests'])}")
         
         # 获取主机名和节点信息
-        hostname = subprocess.run(['hostname'], capture_output=True, text=True).stdout.strip()
+        hostname = socket.gethostname()
         
         # 获取K8s节点信息
         node_name = os.environ.get('NODE_NAME', hostname)
@@ -846,12 +834,10 @@ class GPUChecker:
             performance_tests.append(("nccl", results["nccl"]))
         
         benchmark = GPU_BENCHMARKS.get(gpu_type, {"p2p": 0, "nccl": 0, "bw": 0})
-        performance_pass = True
-        
-        for test_type, result in performance_tests:
-            if result["status"] == "completed" and result["raw_value"] < benchmark.get(test_type, 0):
-                performance_pass = False
-                break
+        performance_pass = not any(
+            result["status"] == "completed" and result["raw_value"] < benchmark.get(test_type, 0)
+            for test_type, result in performance_tests
+        )
         
         # 计算最终结果
         final_result = {
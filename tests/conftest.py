@@ -0,0 +1,33 @@
+import subprocess
+
+import pytest
+
+from baremetal_server import SSHCommandResult, SSHSession
+
+
+class LocalSession(SSHSession):
+    """在本地 bash 中执行命令的会话，代替远程SSH连接"""
+
+    def __init__(self, connection=None, cancel_event=None):
+        super().__init__(connection or {"username": "root"}, cancel_event)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+    def run(self, command, timeout=300, require_root=False):
+        proc = subprocess.run(["bash", "-c", command], capture_output=True, text=True, timeout=timeout)
+        return SSHCommandResult(command=command, exit_code=proc.returncode, stdout=proc.stdout, stderr=proc.stderr)
+
+
+@pytest.fixture
+def local_session():
+    return LocalSession()
+
+
+@pytest.fixture
+def local_ssh(monkeypatch):
+    """接口中新建的 SSHSession 都替换为本地会话"""
+    monkeypatch.setattr("baremetal_server.SSHSession", LocalSession)
@@ -0,0 +1,40 @@
+from baremetal_server import app
+
+CONNECTION = {"host": "127.0.0.1", "username": "root", "auth": {"type": "password", "value": "x"}}
+
+
+def check_commands(commands):
+    response = app.test_client().post("/api/ssh/check-commands", json={"connection": CONNECTION, "commands": commands})
+    return response.status_code, response.get_json()
+
+
+def test_probe_results_are_attributed_to_their_own_command(local_ssh):
+    commands = ["/bin/sh", "/nonexistent/ghx-tool", "sh", "ghx-no-such-command", "/bin/bash"]
+    status, body = check_commands(commands)
+    assert status == 200
+    assert body["data"]["commands"] == {
+        "/bin/sh": True,
+        "/nonexistent/ghx-tool": False,
+        "sh": True,
+        "ghx-no-such-command": False,
+        "/bin/bash": True,
+    }
+
+
+def test_unusual_command_names_get_their_own_result(local_ssh):
+    commands = ["@nvcc_version", "ghx missing tool", "ghx\nnewline", " sh ", "sh"]
+    status, body = check_commands(commands)
+    assert status == 200
+    assert body["data"]["commands"] == {
+        "@nvcc_version": False,
+        "ghx missing tool": False,
+        "ghx\nnewline": False,
+        " sh ": False,
+        "sh": True,
+    }
+
+
+def test_non_string_command_names_are_rejected(local_ssh):
+    status, body = check_commands(["sh", 42])
+    assert status == 400
+    assert body["success"] is False
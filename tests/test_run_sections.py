@@ -0,0 +1,17 @@
+from baremetal_server import SSHSession
+
+
+def test_output_without_trailing_newline_stays_in_its_section(local_session):
+    outputs = local_session.run_sections(["printf abc", "echo def", "printf ''", "printf 'ghi\\njkl'"])
+    assert outputs == ["abc", "def\n", "", "ghi\njkl"]
+
+
+def test_failed_command_does_not_affect_following_sections(local_session):
+    outputs = local_session.run_sections(["echo one; false", "nosuchcommand-ghx 2>/dev/null", "echo three"])
+    assert outputs == ["one\n", "", "three\n"]
+
+
+def test_marker_text_inside_output_does_not_split(local_session):
+    marker_line = f"printf 'x{SSHSession.SECTION_MARKER}1'"
+    outputs = local_session.run_sections([marker_line, "echo last"])
+    assert outputs == [f"x{SSHSession.SECTION_MARKER}1", "last\n"]